@@ -5,61 +5,282 @@ YouTube Video Summarizer using Google Gemini API
 
 import os
 import sys
+import json
 import re
-from typing import Optional
+import time
+import functools
+import contextlib
+import tempfile
+from pathlib import Path
+from types import MappingProxyType
+from typing import Optional, Sequence
 import click
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-import google.generativeai as genai
 from dotenv import load_dotenv
-import validators
 
-console = Console()
+# rich, google.generativeai and youtube_transcript_api are imported where
+# they're used so that `--help` and URL errors don't pay for loading them.
+
+_VIDEO_ID_RE = re.compile(
+    r'^https?://(?:(?:www\.|m\.)?youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|live/)|youtu\.be/)'
+    r'([A-Za-z0-9_-]{11})',
+    re.IGNORECASE
+)
+
+# Prefixes of the two most common URL shapes, checked with str.startswith
+# before falling back to _VIDEO_ID_RE.
+_FAST_URL_PREFIXES = (
+    'https://www.youtube.com/watch?v=',
+    'https://youtube.com/watch?v=',
+    'https://youtu.be/',
+)
+_VIDEO_ID_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-')
+
+_LANGUAGE_MAP = MappingProxyType({
+    'zh': 'Chinese',
+    'cn': 'Chinese',
+    'chinese': 'Chinese',
+    'en': 'English',
+    'english': 'English',
+    'es': 'Spanish',
+    'spanish': 'Spanish',
+    'fr': 'French',
+    'french': 'French',
+    'de': 'German',
+    'german': 'German',
+    'ja': 'Japanese',
+    'japanese': 'Japanese',
+    'ko': 'Korean',
+    'korean': 'Korean',
+})
+
+_DEFAULT_PROMPT_TMPL = (
+    "Please summarize the following YouTube video transcript in {lang}.\n\n"
+    "Cover:\n"
+    "1. The main topic and purpose of the video\n"
+    "2. Key points and arguments\n"
+    "3. Important details, examples or data\n"
+    "4. Conclusions or takeaways\n\n"
+    "Use clear headings and bullet points."
+)
+
+# After this many consecutive calls fail with a server error, further calls
+# fail fast for the cooldown period instead of retrying.
+_BREAKER_THRESHOLD = 3
+_BREAKER_COOLDOWN = 30.0
+
+# Each Gemini request is cut off after _REQUEST_TIMEOUT seconds, and retries
+# stop once _RETRY_DEADLINE seconds have passed since the first attempt.
+_REQUEST_TIMEOUT = 120.0
+_RETRY_DEADLINE = 300.0
+
+# Transcript languages to look for first, per output language; English is
+# always tried after these.
+_TRANSCRIPT_LANGUAGES = MappingProxyType({
+    'Chinese': ('zh', 'zh-Hans', 'zh-Hant', 'zh-TW', 'zh-CN'),
+    'Spanish': ('es',),
+    'French': ('fr',),
+    'German': ('de',),
+    'Japanese': ('ja',),
+    'Korean': ('ko',),
+})
+
+# The XDG spec treats an empty XDG_CACHE_HOME the same as an unset one
+_TRANSCRIPT_CACHE_DIR = Path(
+    os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+) / 'youtube-summarizer' / 'transcripts'
+
+def _parse_youtube(url: str) -> Optional[str]:
+    """Return the video ID of a YouTube URL, or None if it is not one."""
+    if not isinstance(url, str):
+        return None
+    for prefix in _FAST_URL_PREFIXES:
+        if url.startswith(prefix):
+            video_id = url[len(prefix):len(prefix) + 11]
+            if len(video_id) == 11 and _VIDEO_ID_CHARS.issuperset(video_id):
+                return video_id
+            break
+    match = _VIDEO_ID_RE.match(url)
+    return match.group(1) if match else None
+
+def _resolve_language(language: str) -> str:
+    """Map a language code or name to the name used in prompts."""
+    # Codes are usually passed lowercase already, so try them as-is first
+    resolved = _LANGUAGE_MAP.get(language)
+    if resolved is None:
+        resolved = _LANGUAGE_MAP.get(language.casefold(), language)
+    return resolved
+
+def _fetch_transcript(video_id: str, language_codes: Sequence[str] = ('en',)) -> str:
+    """Fetch the transcript of a video as plain text, cached on disk by video ID and language.
+    
+    Cache entries are named after the language of the track they hold, and
+    only entries for one of the preferred languages are read back.
+    """
+    for code in language_codes:
+        try:
+            return (_TRANSCRIPT_CACHE_DIR / f"{video_id}.{code}.txt").read_text(encoding='utf-8')
+        except OSError:
+            pass
+    
+    from youtube_transcript_api import NoTranscriptFound, YouTubeTranscriptApi
+    
+    transcript_list = YouTubeTranscriptApi().list(video_id)
+    try:
+        transcript = transcript_list.find_transcript(language_codes)
+    except NoTranscriptFound:
+        # Fall back to whatever the video has; Gemini translates the summary anyway
+        transcript = next(iter(transcript_list), None)
+        if transcript is None:
+            raise Exception(f"No transcript is available for video {video_id}")
+    text = " ".join(snippet.text for snippet in transcript.fetch())
+    cache_file = _TRANSCRIPT_CACHE_DIR / f"{video_id}.{transcript.language_code}.txt"
+    
+    # A failed cache write shouldn't cost the summary, and writing to a temp
+    # file first keeps an interrupted run from leaving a truncated entry.
+    tmp_name = None
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=cache_file.parent, suffix='.tmp', delete=False
+        ) as f:
+            tmp_name = f.name
+            f.write(text)
+        os.replace(tmp_name, cache_file)
+    except OSError:
+        if tmp_name:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+    return text
+
+_CLIENT = None
+_CLIENT_API_KEY = None
+
+# Circuit breaker state, shared by every summarizer in the process
+_consecutive_failures = 0
+_breaker_open_until = 0.0
+
+def _get_client(api_key: str):
+    """Return the google.generativeai module, configured on first use.
+    
+    genai.configure sets process-wide state, so only one API key is
+    supported per process; asking for a different one is an error.
+    """
+    global _CLIENT, _CLIENT_API_KEY
+    if _CLIENT is None:
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _CLIENT, _CLIENT_API_KEY = genai, api_key
+    elif api_key != _CLIENT_API_KEY:
+        raise ValueError("Only one Gemini API key can be used per process")
+    return _CLIENT
+
+@functools.lru_cache(maxsize=4)
+def _get_model(model_name: str):
+    """Return a GenerativeModel shared by all summarizers; _get_client must run first."""
+    return _CLIENT.GenerativeModel(model_name)
+
+@functools.lru_cache(maxsize=None)
+def _console():
+    """Return the shared stderr Rich console, created on first use.
+    
+    Status, progress and errors go to stderr so that stdout only ever
+    carries the summary itself.
+    """
+    from rich.console import Console
+    return Console(stderr=True)
+
+@functools.lru_cache(maxsize=None)
+def _stdout_console():
+    """Return the Rich console used to render the summary panel on stdout."""
+    from rich.console import Console
+    return Console()
 
 class YouTubeSummarizer:
     def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
         """Initialize the summarizer with API key and model."""
         self.api_key = api_key
         self.model_name = model_name
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
     
-    def extract_video_id(self, url: str) -> Optional[str]:
+    @property
+    def model(self):
+        """The Gemini model, configured on first use."""
+        _get_client(self.api_key)
+        return _get_model(self.model_name)
+    
+    @staticmethod
+    def extract_video_id(url: str) -> Optional[str]:
         """Extract video ID from various YouTube URL formats."""
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-            r'youtube\.com\/watch\?.*&v=([a-zA-Z0-9_-]{11})'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
+        return _parse_youtube(url)
     
-    def validate_url(self, url: str) -> bool:
+    @staticmethod
+    def validate_url(url: str) -> bool:
         """Validate if the URL is a valid YouTube URL."""
-        if not validators.url(url):
-            return False
-        
-        youtube_domains = ['youtube.com', 'youtu.be', 'www.youtube.com']
-        return any(domain in url for domain in youtube_domains)
+        return _parse_youtube(url) is not None
     
     def summarize_video(self, video_url: str, prompt: Optional[str] = None, language: str = "English") -> str:
         """Summarize a YouTube video using Gemini API."""
-        if not self.validate_url(video_url):
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        
+        video_id = _parse_youtube(video_url)
+        if not video_id:
             raise ValueError("Invalid YouTube URL provided")
         
-        # IMPORTANT: Gemini 2.5 Flash does not support direct YouTube video analysis
-        raise Exception(
-            "Cannot access YouTube video content directly.\n\n"
-            "Gemini 2.5 Flash API does not support direct video analysis from YouTube URLs. "
-            "To summarize YouTube videos, you would need to:\n"
-            "1. Extract the video transcript using YouTube API or a transcript extraction library\n"
-            "2. Pass the transcript text to Gemini for summarization\n\n"
-            "Consider using libraries like 'youtube-transcript-api' to extract transcripts first."
+        output_language = _resolve_language(language)
+        if prompt:
+            final_prompt = f"{prompt}\n\nRespond in {output_language}."
+        else:
+            final_prompt = _DEFAULT_PROMPT_TMPL.format(lang=output_language)
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=_console(),
+            transient=True,
+        ) as progress:
+            task = progress.add_task("Fetching transcript...", total=None)
+            language_codes = _TRANSCRIPT_LANGUAGES.get(output_language, ()) + ('en',)
+            transcript = _fetch_transcript(video_id, language_codes)
+            
+            progress.update(task, description="Generating summary...")
+            response = self._call_model([transcript, final_prompt])
+        
+        return response.text
+
+    def _call_model(self, contents):
+        """Call generate_content, retrying rate-limit and unavailable errors with backoff."""
+        from google.api_core.exceptions import ResourceExhausted, ServerError, ServiceUnavailable
+        from tenacity import (
+            Retrying, retry_if_exception_type, stop_after_attempt, stop_after_delay,
+            wait_random_exponential,
         )
+        
+        global _consecutive_failures, _breaker_open_until
+        
+        if time.monotonic() < _breaker_open_until:
+            raise RuntimeError("Gemini API is failing repeatedly, try again in a few seconds")
+        
+        try:
+            for attempt in Retrying(
+                wait=wait_random_exponential(min=1, max=30),
+                stop=stop_after_attempt(5) | stop_after_delay(_RETRY_DEADLINE),
+                retry=retry_if_exception_type((ResourceExhausted, ServiceUnavailable)),
+                reraise=True,
+            ):
+                with attempt:
+                    # Turn off the transport's own retry so that tenacity is
+                    # the only retry layer and each attempt is time-bounded
+                    response = self.model.generate_content(
+                        contents,
+                        request_options={"retry": None, "timeout": _REQUEST_TIMEOUT},
+                    )
+        except ServerError:
+            _consecutive_failures += 1
+            if _consecutive_failures >= _BREAKER_THRESHOLD:
+                _breaker_open_until = time.monotonic() + _BREAKER_COOLDOWN
+            raise
+        
+        _consecutive_failures = 0
+        return response
 
 @click.command()
 @click.argument('video_url')
@@ -68,46 +289,72 @@ class YouTubeSummarizer:
 @click.option('--prompt', help='Custom prompt for summarization')
 @click.option('--output', '-o', help='Save summary to file')
 @click.option('--lang', '-l', default='English', help='Output language (e.g., Chinese, zh, Spanish, French)')
-def main(video_url: str, api_key: str, model: str, prompt: str, output: str, lang: str):
+@click.option('--json', 'json_output', is_flag=True, help='Print the summary as a JSON object instead of a panel')
+def main(video_url: str, api_key: str, model: str, prompt: str, output: str, lang: str, json_output: bool):
     """Summarize YouTube videos using Google Gemini API."""
-    
     load_dotenv()
     
+    # These checks run before rich is imported, so they report plainly
     if not api_key:
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
-            console.print("[red]Error: No API key provided. Set GEMINI_API_KEY environment variable or use --api-key flag[/red]")
+            click.echo("Error: No API key provided. Set GEMINI_API_KEY environment variable or use --api-key flag", err=True)
             sys.exit(1)
     
+    if not YouTubeSummarizer.validate_url(video_url):
+        click.echo("Error: Invalid YouTube URL provided", err=True)
+        sys.exit(1)
+    
+    from rich.markup import escape
+    from rich.panel import Panel
+    from rich.text import Text
+    
+    console = _console()
+    
     try:
         console.print(Panel.fit(
             f"[bold cyan]YouTube Video Summarizer[/bold cyan]\n"
-            f"[dim]Model: {model}[/dim]",
+            f"[dim]Model: {escape(model)}[/dim]",
             border_style="cyan"
         ))
         
         summarizer = YouTubeSummarizer(api_key, model)
         
-        console.print(f"\n[yellow]Video URL:[/yellow] {video_url}")
-        console.print(f"[yellow]Output Language:[/yellow] {lang}")
+        console.print(f"\n[yellow]Video URL:[/yellow] {escape(video_url)}")
+        output_language = _resolve_language(lang)
+        console.print(f"[yellow]Output Language:[/yellow] {escape(output_language)}")
         
         summary = summarizer.summarize_video(video_url, prompt, lang)
         
-        console.print("\n[green]Summary:[/green]\n")
-        console.print(Panel(summary, border_style="green", padding=(1, 2)))
+        if json_output:
+            result = {"url": video_url, "model": model, "lang": output_language, "summary": summary}
+            sys.stdout.buffer.write(json.dumps(result, ensure_ascii=False).encode('utf-8') + b"\n")
+            sys.stdout.buffer.flush()
+        elif output or not sys.stdout.isatty():
+            # The panel is only worth rendering for someone reading a terminal
+            sys.stdout.buffer.write(summary.encode('utf-8') + b"\n")
+            sys.stdout.buffer.flush()
+        else:
+            stdout = _stdout_console()
+            stdout.print("\n[green]Summary:[/green]\n")
+            # Text() skips markup parsing, so brackets in the summary print verbatim
+            stdout.print(Panel(Text(summary), border_style="green", padding=(1, 2)))
         
         if output:
-            with open(output, 'w', encoding='utf-8') as f:
-                f.write(f"YouTube Video Summary\n")
-                f.write(f"URL: {video_url}\n")
-                f.write(f"Model: {model}\n")
-                f.write(f"Language: {lang}\n")
-                f.write(f"\n{'-' * 50}\n\n")
+            header = "".join([
+                "YouTube Video Summary\n",
+                f"URL: {video_url}\n",
+                f"Model: {model}\n",
+                f"Language: {lang}\n",
+                f"\n{'-' * 50}\n\n",
+            ])
+            with open(output, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.write(header)
                 f.write(summary)
-            console.print(f"\n[green]Summary saved to:[/green] {output}")
+            console.print(f"\n[green]Summary saved to:[/green] {escape(output)}")
     
     except Exception as e:
-        console.print(f"[red]Error:[/red] {str(e)}")
+        console.print(f"[red]Error:[/red] {escape(str(e))}")
         sys.exit(1)
 
 if __name__ == "__main__":